@@ -14,6 +14,8 @@ import re
 import time
 import logging
 import os
+import threading
+from contextlib import contextmanager
 
 app = Flask(__name__)
 CORS(app)
@@ -29,6 +31,8 @@ HACKERRANK_USERNAME = os.environ.get("HACKERRANK_USERNAME", "24p31a1224")
 HACKERRANK_PASSWORD = os.environ.get("HACKERRANK_PASSWORD", "")   # optional
 GFG_USERNAME        = os.environ.get("GFG_USERNAME",        "24p31ap7i2")
 GFG_PASSWORD        = os.environ.get("GFG_PASSWORD",        "")   # optional
+SCRAPER_QUEUE_DB    = os.environ.get("SCRAPER_QUEUE_DB",    "")   # optional: shared SQLite file → multi-node mode
+SCRAPER_ROLE        = os.environ.get("SCRAPER_ROLE",        "web")  # "web" (API + scheduler) or "worker"
 # ----------------------------
 
 # Load .env file if present (local development)
@@ -43,6 +47,8 @@ try:
     HACKERRANK_PASSWORD = os.environ.get("HACKERRANK_PASSWORD", HACKERRANK_PASSWORD)
     GFG_USERNAME        = os.environ.get("GFG_USERNAME",        GFG_USERNAME)
     GFG_PASSWORD        = os.environ.get("GFG_PASSWORD",        GFG_PASSWORD)
+    SCRAPER_QUEUE_DB    = os.environ.get("SCRAPER_QUEUE_DB",    SCRAPER_QUEUE_DB)
+    SCRAPER_ROLE        = os.environ.get("SCRAPER_ROLE",        SCRAPER_ROLE)
 except ImportError:
     pass  # python-dotenv not installed; use system env vars directly
 
@@ -218,84 +224,83 @@ def _codechef_login(username, password):
             driver.quit()
 
 
-def get_codechef_stats(username, password=None):
-    """Fetch CodeChef stats.
-    - If a password is available (env var), logs in to get the full profile
-      (rating, stars, highest rating, global/country rank).
-    - Otherwise falls back to the unauthenticated HTML scrape.
-    Credentials are NEVER stored in code — read from env vars only.
+def _codechef_authenticated_stats(username, password):
+    """Log in and scrape the full CodeChef profile (incl. highest rating).
+    Returns the stats dict, or None if login or parsing fails.
     """
-    _password = password or CODECHEF_PASSWORD
+    session = _codechef_login(username, password)
+    if not session:
+        return None
+    try:
+        page_headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+            "Accept": "text/html,application/xhtml+xml",
+        }
+        resp = session.get(f"https://www.codechef.com/users/{username}",
+                           headers=page_headers, timeout=12)
+        text = resp.text
+        soup = BeautifulSoup(text, "html.parser")
 
-    # ── Authenticated path ─────────────────────────────────────────────────────
-    if _password:
-        session = _codechef_login(username, _password)
-        if session:
-            try:
-                page_headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                    "Accept": "text/html,application/xhtml+xml",
-                }
-                resp = session.get(f"https://www.codechef.com/users/{username}",
-                                   headers=page_headers, timeout=12)
-                text = resp.text
-                soup = BeautifulSoup(text, "html.parser")
-
-                # Rating
-                rating = "N/A"
-                rating_el = soup.find("div", class_="rating-number")
-                if rating_el:
-                    rating = rating_el.text.strip()
-                if rating == "N/A":
-                    m = re.search(r'Drupal\.settings,\s*({.*?})\);', text, re.DOTALL)
-                    if m:
-                        s = json.loads(m.group(1))
-                        v = s.get("user_initial_ratings", {}).get("all")
-                        if v is not None:
-                            rating = str(v)
-
-                # Stars
-                stars = "N/A"
-                stars_el = soup.find("span", class_="rating")
-                if stars_el:
-                    stars = stars_el.text.strip()
-
-                # Highest rating
-                highest = "N/A"
-                highest_el = soup.find("small")
-                if highest_el and "Highest" in highest_el.text:
-                    nums = re.findall(r'\d+', highest_el.text)
-                    if nums:
-                        highest = nums[0]
-
-                # Ranks
-                global_rank = country_rank = "N/A"
-                rank_els = soup.select(".rating-ranks strong")
-                if len(rank_els) >= 2:
-                    global_rank  = rank_els[0].text.strip()
-                    country_rank = rank_els[1].text.strip()
-
-                # Problems solved
-                total_problems = "N/A"
-                m2 = re.search(r'Total Problems Solved:\s*(\d+)', text)
-                if m2:
-                    total_problems = m2.group(1)
-
-                return {
-                    "username": username,
-                    "rating": rating,
-                    "stars": stars,
-                    "highest_rating": highest,
-                    "total_problems_solved": total_problems,
-                    "global_rank": global_rank,
-                    "country_rank": country_rank,
-                    "authenticated": True,
-                }
-            except Exception as e:
-                logger.error(f"CodeChef authenticated scrape failed: {e}")
-                # fall through to unauthenticated
+        # Rating
+        rating = "N/A"
+        rating_el = soup.find("div", class_="rating-number")
+        if rating_el:
+            rating = rating_el.text.strip()
+        if rating == "N/A":
+            m = re.search(r'Drupal\.settings,\s*({.*?})\);', text, re.DOTALL)
+            if m:
+                s = json.loads(m.group(1))
+                v = s.get("user_initial_ratings", {}).get("all")
+                if v is not None:
+                    rating = str(v)
 
-    # ── Unauthenticated path (public HTML) ────────────────────────────────────
+        # Stars
+        stars = "N/A"
+        stars_el = soup.find("span", class_="rating")
+        if stars_el:
+            stars = stars_el.text.strip()
+
+        # Highest rating
+        highest = "N/A"
+        highest_el = soup.find("small")
+        if highest_el and "Highest" in highest_el.text:
+            nums = re.findall(r'\d+', highest_el.text)
+            if nums:
+                highest = nums[0]
+
+        # Ranks
+        global_rank = country_rank = "N/A"
+        rank_els = soup.select(".rating-ranks strong")
+        if len(rank_els) >= 2:
+            global_rank  = rank_els[0].text.strip()
+            country_rank = rank_els[1].text.strip()
+
+        # Problems solved
+        total_problems = "N/A"
+        m2 = re.search(r'Total Problems Solved:\s*(\d+)', text)
+        if m2:
+            total_problems = m2.group(1)
+
+        return {
+            "username": username,
+            "rating": rating,
+            "stars": stars,
+            "highest_rating": highest,
+            "total_problems_solved": total_problems,
+            "global_rank": global_rank,
+            "country_rank": country_rank,
+            "authenticated": True,
+        }
+    except Exception as e:
+        logger.error(f"CodeChef authenticated scrape failed: {e}")
+        return None
+
+
+def _codechef_public_stats(username):
+    """Scrape the public CodeChef profile with a single HTTP request.
+    Returns the stats dict, or None on failure or when nothing could be parsed
+    (e.g. a Cloudflare challenge page).
+    """
     try:
         page_headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
@@ -304,6 +309,7 @@ def get_codechef_stats(username, password=None):
         }
         resp = requests.get(f"https://www.codechef.com/users/{username}",
                             headers=page_headers, timeout=12)
+        resp.raise_for_status()
         text = resp.text
         soup = BeautifulSoup(text, "html.parser")
 
@@ -334,6 +340,10 @@ def get_codechef_stats(username, password=None):
         if m2:
             total_problems = m2.group(1)
 
+        if rating == "N/A" and total_problems == "N/A":
+            logger.warning("CodeChef public scrape: no profile data on page")
+            return None
+
         return {
             "username": username,
             "rating": rating,
@@ -344,8 +354,13 @@ def get_codechef_stats(username, password=None):
             "country_rank": country_rank,
             "authenticated": False,
         }
-    except Exception:
-        pass  # fall through to Selenium
+    except Exception as e:
+        logger.warning(f"CodeChef public scrape failed: {e}")
+        return None
+
+
+def _codechef_selenium_stats(username):
+    """Last-resort scrape of the public CodeChef profile via Selenium."""
     driver = None
     try:
         driver = get_selenium_driver()
@@ -408,6 +423,56 @@ def get_codechef_stats(username, password=None):
             driver.quit()
 
 
+def get_codechef_stats(username, password=None, on_public=None):
+    """Fetch CodeChef stats.
+    - If a password is available (env var), logs in to get the full profile
+      (rating, stars, highest rating, global/country rank).
+    - Otherwise falls back to the unauthenticated HTML scrape.
+    Credentials are NEVER stored in code — read from env vars only.
+
+    Hedged mode: when ``on_public`` is given and a password is set, the login
+    runs in a background thread while the cheap public page is fetched
+    straight away. ``on_public`` is called with the public stats as soon as
+    they arrive, and the function then waits for the login and returns the
+    public stats overlaid with the authenticated fields.
+    """
+    _password = password or CODECHEF_PASSWORD
+
+    # ── Hedged path: race public fetch against login ──────────────────────────
+    if _password and on_public is not None:
+        auth_result = {}
+        auth_thread = threading.Thread(
+            target=lambda: auth_result.update(
+                stats=_codechef_authenticated_stats(username, _password)),
+            daemon=True,
+        )
+        auth_thread.start()
+
+        public = _codechef_public_stats(username)
+        if public:
+            on_public(public)
+        auth_thread.join()
+
+        auth = auth_result.get("stats")
+        if auth:
+            return {**(public or {}), **auth}
+        if public:
+            return public
+        return _codechef_selenium_stats(username)
+
+    # ── Authenticated path ─────────────────────────────────────────────────────
+    if _password:
+        auth = _codechef_authenticated_stats(username, _password)
+        if auth:
+            return auth
+
+    # ── Unauthenticated path (public HTML) ────────────────────────────────────
+    public = _codechef_public_stats(username)
+    if public:
+        return public
+    return _codechef_selenium_stats(username)
+
+
 # ─────────────────────────────────────────────────────
 # HackerRank  (REST API — no Selenium needed)
 # ─────────────────────────────────────────────────────
@@ -542,8 +607,16 @@ def get_gfg_stats(username):
             driver.quit()
 
 
-import threading
 from apscheduler.schedulers.background import BackgroundScheduler
+from job_queue import JobQueue
+
+# Platform → (scraper, configured username); shared by the scheduler and scraper nodes
+PLATFORMS = {
+    "leetcode":   (get_leetcode_stats,   LEETCODE_USERNAME),
+    "codechef":   (get_codechef_stats,   CODECHEF_USERNAME),
+    "hackerrank": (get_hackerrank_stats, HACKERRANK_USERNAME),
+    "gfg":        (get_gfg_stats,        GFG_USERNAME),
+}
 
 # ─────────────────────────────────────────────────────
 # Cache Setup
@@ -566,33 +639,240 @@ def save_cache(data):
 
 # Global cache
 STATS_CACHE = load_cache()
+CACHE_LOCK = threading.Lock()
+# One scrape per platform at a time, whether from its adaptive job or a forced update
+SCRAPE_LOCKS = {platform: threading.Lock() for platform in PLATFORMS}
+
+# Multi-node mode: scraper nodes lease jobs from a shared SQLite queue and
+# write results back to its result store, which the API then reads from.
+JOB_QUEUE = JobQueue(SCRAPER_QUEUE_DB) if SCRAPER_QUEUE_DB else None
+
+def current_stats():
+    """Stats served by the API — the shared store in multi-node mode, else the local cache."""
+    if JOB_QUEUE is None:
+        return STATS_CACHE
+    results = JOB_QUEUE.get_results((p, u) for p, (_, u) in PLATFORMS.items())
+    return {platform: results[(platform, username)]
+            for platform, (_, username) in PLATFORMS.items()
+            if (platform, username) in results}
+
+def platform_stats(platform):
+    """Stats for a single platform, reading only its own row in multi-node mode."""
+    if JOB_QUEUE is None:
+        return STATS_CACHE.get(platform, {})
+    return JOB_QUEUE.get_result(platform, PLATFORMS[platform][1]) or {}
+
+def merge_codechef_public(stats, previous):
+    """Overlay fresh public CodeChef stats on the previous result, keeping its
+    highest rating until the fresh login lands."""
+    merged = dict(stats)
+    if (previous or {}).get("highest_rating", "N/A") != "N/A":
+        merged["highest_rating"] = previous["highest_rating"]
+    return merged
+
+def _publish_codechef_public(stats):
+    """Serve public CodeChef numbers while the authenticated login is still running."""
+    global STATS_CACHE
+    with CACHE_LOCK:
+        # On a cold start the other platforms aren't in yet; keep serving 202
+        if not STATS_CACHE:
+            return
+        STATS_CACHE = {**STATS_CACHE,
+                       "codechef": merge_codechef_public(stats, STATS_CACHE.get("codechef"))}
+    logger.info("CodeChef: public stats served, waiting for authenticated fetch...")
+
+def _scrape_platform(platform):
+    scraper, username = PLATFORMS[platform]
+    if platform == "codechef":
+        return scraper(username, on_public=_publish_codechef_public)
+    return scraper(username)
+
+def _timed_scrape(platform):
+    started = time.monotonic()
+    stats = _scrape_platform(platform)
+    _record_cost(platform, time.monotonic() - started)
+    return stats
+
+@contextmanager
+def _scrape_slot(platform):
+    """Yields True if the caller may scrape `platform` now, False if a scrape
+    of it is already running (the caller should skip, not queue up)."""
+    lock = SCRAPE_LOCKS[platform]
+    acquired = lock.acquire(blocking=False)
+    if not acquired:
+        logger.info(f"{platform}: scrape already in progress, skipping")
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            lock.release()
+
+def _store_platform(platform, stats):
+    """Swap one platform's stats into the cache and persist it.
+    Returns whether the stats changed since the last stored result, or None
+    for a failed scrape (which keeps the last good stats in place)."""
+    global STATS_CACHE
+    with CACHE_LOCK:
+        if "error" in stats and platform in STATS_CACHE:
+            logger.warning(f"{platform}: scrape failed, keeping last stats: {stats['error']}")
+            return None
+        if platform == "codechef" and "error" not in stats and not stats.get("authenticated"):
+            # Login failed this run — don't lose the highest rating we already know
+            stats = merge_codechef_public(stats, STATS_CACHE.get("codechef"))
+        changed = _observe(platform, stats)
+        STATS_CACHE = {**STATS_CACHE, platform: stats}
+        save_cache(STATS_CACHE)
+    return changed
+
+def _scrape_and_store(platform):
+    """Scrape and store one platform; None if skipped because it is already running."""
+    with _scrape_slot(platform) as free:
+        if not free:
+            return None
+        return _store_platform(platform, _timed_scrape(platform))
 
 def update_all_stats():
     """Background task to fetch and cache all stats."""
-    logger.info("Starting background scrape of all platforms...")
-    new_stats = {
-        "leetcode":   get_leetcode_stats(LEETCODE_USERNAME),
-        "codechef":   get_codechef_stats(CODECHEF_USERNAME),
-        "hackerrank": get_hackerrank_stats(HACKERRANK_USERNAME),
-        "gfg":        get_gfg_stats(GFG_USERNAME),
-    }
-    
     global STATS_CACHE
-    STATS_CACHE = new_stats
-    save_cache(new_stats)
+    if JOB_QUEUE is not None:
+        for platform, (_, username) in PLATFORMS.items():
+            JOB_QUEUE.enqueue(platform, username)
+        logger.info("Scrape jobs enqueued for all platforms.")
+        return
+
+    logger.info("Starting background scrape of all platforms...")
+    if STATS_CACHE:
+        # Store each platform as it lands so a concurrent adaptive refresh
+        # is never overwritten with older data
+        for platform in PLATFORMS:
+            _scrape_and_store(platform)
+    else:
+        # Cold start: publish everything at once so /api/stats answers 202
+        # until every platform is in
+        new_stats = {}
+        for platform in PLATFORMS:
+            with _scrape_slot(platform) as free:
+                if free:
+                    new_stats[platform] = _timed_scrape(platform)
+        with CACHE_LOCK:
+            for platform, stats in new_stats.items():
+                _observe(platform, stats)
+            STATS_CACHE = {**STATS_CACHE, **new_stats}
+            save_cache(STATS_CACHE)
     logger.info("Background scrape complete. Cache updated.")
 
+# ─────────────────────────────────────────────────────
+# Adaptive refresh scheduling
+# ─────────────────────────────────────────────────────
+# Per-platform (min, start, max) refresh interval in hours. Each refresh halves
+# the interval when the data changed and stretches it 1.5× when it didn't, so
+# volatile data (LeetCode streak) is polled often and static data (HackerRank
+# badges) drifts towards the maximum. The result is then stretched by the
+# platform's average scrape cost, so browser scrapes run less often.
+REFRESH_POLICY = {
+    "leetcode":   (1, 3, 12),
+    "codechef":   (2, 6, 24),
+    "hackerrank": (6, 12, 48),
+    "gfg":        (3, 6, 24),
+}
+REFRESH_COST_SCALE = 60    # a scrape averaging this many seconds doubles its interval
+REFRESH_JITTER     = 0.1   # random offset, as a fraction of the interval, to spread browser scrapes
+
+# platform → change-driven interval (seconds), last observed stats, average
+# scrape cost (seconds) and, in multi-node mode, the newest store write judged
+REFRESH_STATE = {
+    platform: {"interval": start * 3600, "fingerprint": None, "cost": None,
+               "seen_at": time.time()}
+    for platform, (_, start, _) in REFRESH_POLICY.items()
+}
+# Re-entrant: _observe runs both on its own and inside refresh_platform's update
+REFRESH_LOCK = threading.RLock()
+
+def _refresh_job_id(platform):
+    return f"refresh:{platform}:{PLATFORMS[platform][1]}"
+
+def _fingerprint(stats):
+    if not stats or "error" in stats:
+        return None
+    return json.dumps(stats, sort_keys=True)
+
+def _observe(platform, stats):
+    """Record a complete result. True if it differs from the previous one,
+    False if not (or if there is nothing to compare with yet), None if the
+    result is a failure and says nothing about change."""
+    fingerprint = _fingerprint(stats)
+    if fingerprint is None:
+        return None
+    with REFRESH_LOCK:
+        state = REFRESH_STATE[platform]
+        changed = state["fingerprint"] is not None and fingerprint != state["fingerprint"]
+        state["fingerprint"] = fingerprint
+    return changed
+
+def _record_cost(platform, duration):
+    """Fold a scrape duration into the running average (same weights as job_queue)."""
+    with REFRESH_LOCK:
+        state = REFRESH_STATE[platform]
+        state["cost"] = duration if state["cost"] is None else 0.7 * state["cost"] + 0.3 * duration
+
+def _next_interval(platform, changed):
+    """Adapt the change-driven interval (None = no new data, keep it) and
+    return it stretched by the average scrape cost."""
+    low, _, high = (hours * 3600 for hours in REFRESH_POLICY[platform])
+    with REFRESH_LOCK:
+        state = REFRESH_STATE[platform]
+        if changed is not None:
+            interval = state["interval"] / 2 if changed else state["interval"] * 1.5
+            state["interval"] = min(max(interval, low), high)
+        cost_weight = 1 + (state["cost"] or 0) / REFRESH_COST_SCALE
+        return min(state["interval"] * cost_weight, high)
+
+def refresh_platform(platform):
+    """Scheduled refresh of one platform that re-tunes its own interval."""
+    _, username = PLATFORMS[platform]
+    if JOB_QUEUE is not None:
+        # Results land asynchronously — only a complete result written since
+        # the last check says anything; pending or partial ones don't count
+        info = JOB_QUEUE.get_result_info(platform, username)
+        changed = None
+        with REFRESH_LOCK:
+            state = REFRESH_STATE[platform]
+            if info and not info["partial"] and info["updated_at"] > state["seen_at"]:
+                state["seen_at"] = info["updated_at"]
+                changed = _observe(platform, info["data"])
+            if info and info["avg_duration"] is not None:
+                state["cost"] = info["avg_duration"]
+        JOB_QUEUE.enqueue(platform, username)
+    else:
+        changed = _scrape_and_store(platform)
+
+    interval = _next_interval(platform, changed)
+    scheduler.reschedule_job(
+        _refresh_job_id(platform), trigger="interval",
+        seconds=interval, jitter=int(interval * REFRESH_JITTER),
+    )
+    outcome = "no new data" if changed is None else ("changed" if changed else "unchanged")
+    logger.info(f"{platform}: {outcome}, next refresh in ~{interval / 3600:.1f}h")
+
 # ─────────────────────────────────────────────────────
 # APScheduler Initialization
 # ─────────────────────────────────────────────────────
 scheduler = BackgroundScheduler()
-# Run every 6 hours
-scheduler.add_job(func=update_all_stats, trigger="interval", hours=6)
-scheduler.start()
+# One jittered, adaptive job per platform/user instead of a single 6-hourly burst
+_initial_stats = current_stats()
+for _platform in PLATFORMS:
+    _, _start, _ = REFRESH_POLICY[_platform]
+    _observe(_platform, _initial_stats.get(_platform))
+    scheduler.add_job(func=refresh_platform, args=[_platform], id=_refresh_job_id(_platform),
+                      trigger="interval", hours=_start, jitter=int(_start * 3600 * REFRESH_JITTER))
 
-# Also trigger an initial scrape asynchronously if cache is empty
-if not STATS_CACHE:
-    threading.Thread(target=update_all_stats).start()
+# Scraper nodes only consume the queue; the web process owns scheduling
+if SCRAPER_ROLE != "worker":
+    scheduler.start()
+
+    # Also trigger an initial scrape asynchronously if cache is empty
+    if not _initial_stats:
+        threading.Thread(target=update_all_stats).start()
 
 
 # ─────────────────────────────────────────────────────
@@ -603,29 +883,31 @@ def get_all_stats():
     """
     Return the cached stats for all platforms.
     """
-    if not STATS_CACHE:
+    stats = current_stats()
+    # Scraper nodes land platforms one by one; stay in "fetching" until all are in
+    if any(platform not in stats for platform in PLATFORMS):
         return jsonify({"status": "fetching", "message": "Stats are currently being scraped for the first time. Please try again in a minute."}), 202
-    return jsonify(STATS_CACHE)
+    return jsonify(stats)
 
 
 @app.route("/api/leetcode", methods=["GET"])
 def api_leetcode():
-    return jsonify(STATS_CACHE.get("leetcode", {}))
+    return jsonify(platform_stats("leetcode"))
 
 
 @app.route("/api/codechef", methods=["GET"])
 def api_codechef():
-    return jsonify(STATS_CACHE.get("codechef", {}))
+    return jsonify(platform_stats("codechef"))
 
 
 @app.route("/api/hackerrank", methods=["GET"])
 def api_hackerrank():
-    return jsonify(STATS_CACHE.get("hackerrank", {}))
+    return jsonify(platform_stats("hackerrank"))
 
 
 @app.route("/api/gfg", methods=["GET"])
 def api_gfg():
-    return jsonify(STATS_CACHE.get("gfg", {}))
+    return jsonify(platform_stats("gfg"))
 
 
 @app.route("/api/force-update", methods=["POST"])
@@ -644,4 +926,5 @@ if __name__ == "__main__":
     try:
         app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)), debug=False)
     finally:
-        scheduler.shutdown()
\ No newline at end of file
+        if scheduler.running:
+            scheduler.shutdown()
\ No newline at end of file
@@ -0,0 +1,271 @@
+"""
+Durable SQLite job queue + shared result store for multi-node scraping.
+
+The web process and every scraper node open the same SQLite file. The web
+process enqueues one job per (platform, username); nodes lease jobs for the
+users that hash to them on a consistent-hash ring of live nodes, scrape, and
+write the result back to the `results` table that the Flask routes read.
+
+SQLite in WAL mode needs shared memory, so all nodes must run on the SAME
+HOST (e.g. several containers sharing a local volume) — never put the file
+on a network filesystem. Nodes split Chrome load across processes on one
+machine; going beyond one machine needs a real broker behind this interface.
+
+- Leases expire after `visibility_timeout` seconds, so a job held by a node
+  that crashed becomes visible again and is picked up by the new owner.
+  A failed job is retried after an exponential backoff (`retry_backoff`
+  seconds, doubling per attempt) and dropped once it has been leased
+  `max_attempts` times.
+- Nodes heartbeat into the `nodes` table; a node that stops heartbeating
+  drops out of the ring and its users are re-sharded across the survivors.
+"""
+
+import bisect
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import closing
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    platform      TEXT    NOT NULL,
+    username      TEXT    NOT NULL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    lease_owner   TEXT,
+    lease_expires REAL    NOT NULL DEFAULT 0,
+    enqueued_at   REAL    NOT NULL,
+    UNIQUE (platform, username)
+);
+CREATE TABLE IF NOT EXISTS results (
+    platform     TEXT    NOT NULL,
+    username     TEXT    NOT NULL,
+    data         TEXT    NOT NULL,
+    partial      INTEGER NOT NULL DEFAULT 0,
+    avg_duration REAL,
+    node_id      TEXT,
+    updated_at   REAL    NOT NULL,
+    PRIMARY KEY (platform, username)
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    node_id   TEXT PRIMARY KEY,
+    last_seen REAL NOT NULL
+);
+"""
+
+
+def _hash(key):
+    return int(hashlib.md5(key.encode("utf-8")).hexdigest()[:16], 16)
+
+
+class HashRing:
+    """Consistent-hash ring mapping usernames to node ids."""
+
+    def __init__(self, nodes, replicas=64):
+        self._ring = sorted(
+            (_hash(f"{node}#{i}"), node) for node in nodes for i in range(replicas)
+        )
+        self._keys = [h for h, _ in self._ring]
+
+    def node_for(self, key):
+        if not self._ring:
+            return None
+        idx = bisect.bisect(self._keys, _hash(key)) % len(self._ring)
+        return self._ring[idx][1]
+
+
+class JobQueue:
+    """SQLite-backed job queue with leases, plus the shared result store."""
+
+    def __init__(self, path, visibility_timeout=300, node_ttl=60, max_attempts=3,
+                 retry_backoff=60):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.node_ttl = node_ttl
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        with closing(self._connect()) as conn:
+            # WAL is persistent in the file, so this only needs doing once
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # Autocommit mode; multi-statement updates use explicit BEGIN IMMEDIATE
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    # ── Producer side ────────────────────────────────────────────────────────
+    def enqueue(self, platform, username):
+        """Queue a scrape; a no-op if one is already pending for this user."""
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO jobs (platform, username, enqueued_at) VALUES (?, ?, ?)",
+                (platform, username, time.time()),
+            )
+
+    # ── Node membership ──────────────────────────────────────────────────────
+    def heartbeat(self, node_id):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO nodes (node_id, last_seen) VALUES (?, ?) "
+                "ON CONFLICT(node_id) DO UPDATE SET last_seen = excluded.last_seen",
+                (node_id, time.time()),
+            )
+
+    def leave(self, node_id):
+        """Remove a node from the ring (clean shutdown)."""
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM nodes WHERE node_id = ?", (node_id,))
+            conn.execute(
+                "UPDATE jobs SET lease_owner = NULL, lease_expires = 0 WHERE lease_owner = ?",
+                (node_id,),
+            )
+
+    def _live_nodes(self, conn):
+        cutoff = time.time() - self.node_ttl
+        rows = conn.execute("SELECT node_id FROM nodes WHERE last_seen >= ?", (cutoff,))
+        return [r[0] for r in rows]
+
+    def live_nodes(self):
+        with closing(self._connect()) as conn:
+            return self._live_nodes(conn)
+
+    # ── Consumer side ────────────────────────────────────────────────────────
+    def lease(self, node_id, limit=1):
+        """Lease up to `limit` visible jobs whose user shards to `node_id`.
+        Returns a list of (job_id, platform, username).
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Jobs whose nodes kept dying mid-scrape have used up their attempts
+            conn.execute(
+                "DELETE FROM jobs WHERE lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts),
+            )
+            ring = HashRing(self._live_nodes(conn))
+            rows = conn.execute(
+                "SELECT id, platform, username FROM jobs "
+                "WHERE lease_expires < ? ORDER BY enqueued_at",
+                (now,),
+            ).fetchall()
+            leased = [r for r in rows if ring.node_for(r[2]) == node_id][:limit]
+            for job_id, _, _ in leased:
+                conn.execute(
+                    "UPDATE jobs SET lease_owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                    "WHERE id = ?",
+                    (node_id, now + self.visibility_timeout, job_id),
+                )
+            conn.execute("COMMIT")
+            return leased
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _write_if_leased(self, job_id, node_id, platform, username, data, partial, duration=None):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Re-leasing to another node changes lease_owner, so this is the ownership check
+            held = conn.execute(
+                "SELECT 1 FROM jobs WHERE id = ? AND lease_owner = ?", (job_id, node_id)
+            ).fetchone()
+            if held:
+                self._put_result(conn, platform, username, data, node_id, partial, duration)
+                if not partial:
+                    conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            conn.execute("COMMIT")
+            return bool(held)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def complete(self, job_id, node_id, platform, username, data, duration=None):
+        """Store the result and ack the job, unless our lease was lost.
+        `duration` (seconds the scrape took) feeds the row's running average.
+        """
+        return self._write_if_leased(job_id, node_id, platform, username, data,
+                                     partial=False, duration=duration)
+
+    def publish_partial(self, job_id, node_id, platform, username, data):
+        """Store an early partial result while still holding the lease (job stays leased)."""
+        return self._write_if_leased(job_id, node_id, platform, username, data, partial=True)
+
+    def fail(self, job_id, node_id):
+        """Release a job for retry after a backoff, or drop it after `max_attempts`."""
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE id = ? AND lease_owner = ? AND attempts >= ?",
+                (job_id, node_id, self.max_attempts),
+            )
+            # Hidden for retry_backoff × 2^(attempts-1) seconds before it can be leased again
+            conn.execute(
+                "UPDATE jobs SET lease_owner = NULL, "
+                "lease_expires = ? + ? * (1 << (attempts - 1)) "
+                "WHERE id = ? AND lease_owner = ?",
+                (time.time(), self.retry_backoff, job_id, node_id),
+            )
+
+    # ── Result store ─────────────────────────────────────────────────────────
+    def _put_result(self, conn, platform, username, data, node_id=None, partial=False,
+                    duration=None):
+        # avg_duration is an exponential moving average; a NULL duration leaves it as is
+        conn.execute(
+            "INSERT INTO results (platform, username, data, partial, avg_duration, node_id, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(platform, username) DO UPDATE SET "
+            "data = excluded.data, partial = excluded.partial, "
+            "avg_duration = COALESCE(0.7 * results.avg_duration + 0.3 * excluded.avg_duration, "
+            "excluded.avg_duration, results.avg_duration), "
+            "node_id = excluded.node_id, updated_at = excluded.updated_at",
+            (platform, username, json.dumps(data), int(partial), duration, node_id, time.time()),
+        )
+
+    def put_result(self, platform, username, data, node_id=None):
+        with closing(self._connect()) as conn:
+            self._put_result(conn, platform, username, data, node_id)
+
+    def get_result(self, platform, username):
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT data FROM results WHERE platform = ? AND username = ?",
+                (platform, username),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_result_info(self, platform, username):
+        """The stored result with its metadata: a dict with data, partial,
+        avg_duration and updated_at, or None if there is no result yet.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT data, partial, avg_duration, updated_at FROM results "
+                "WHERE platform = ? AND username = ?",
+                (platform, username),
+            ).fetchone()
+        if not row:
+            return None
+        data, partial, avg_duration, updated_at = row
+        return {"data": json.loads(data), "partial": bool(partial),
+                "avg_duration": avg_duration, "updated_at": updated_at}
+
+    def get_results(self, keys):
+        """Results for several (platform, username) pairs in one query.
+        Returns {(platform, username): data} for the pairs that have one.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        where = " OR ".join(["(platform = ? AND username = ?)"] * len(keys))
+        params = [part for key in keys for part in key]
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT platform, username, data FROM results WHERE {where}", params
+            ).fetchall()
+        return {(p, u): json.loads(d) for p, u, d in rows}
@@ -0,0 +1,125 @@
+"""
+Scraper node — leases jobs from the shared SQLite queue and scrapes them.
+
+Opt-in: start any number of nodes next to the web process, all on the same
+host and pointing at the same SCRAPER_QUEUE_DB file (see job_queue for why
+the file can't be shared across machines):
+
+    SCRAPER_QUEUE_DB=/data/queue.db python scraper_node.py
+
+Each node owns the users that hash to it on the ring of live nodes, so
+adding a node spreads the cohort's Chrome instances over one more process.
+SCRAPER_NODE_CONCURRENCY caps how many scrapes a node runs at once.
+"""
+
+import os
+import signal
+import socket
+import threading
+import time
+
+# Must be set before importing the app so it doesn't start its own scheduler,
+# even if the shared container env says SCRAPER_ROLE=web
+os.environ["SCRAPER_ROLE"] = "worker"
+
+from backend_scraper import JOB_QUEUE, PLATFORMS, logger, merge_codechef_public
+
+NODE_ID          = os.environ.get("SCRAPER_NODE_ID", f"{socket.gethostname()}-{os.getpid()}")
+NODE_CONCURRENCY = int(os.environ.get("SCRAPER_NODE_CONCURRENCY", "1"))
+POLL_INTERVAL    = float(os.environ.get("SCRAPER_POLL_INTERVAL", "5"))
+HEARTBEAT_EVERY  = JOB_QUEUE.node_ttl / 3 if JOB_QUEUE else 20
+
+
+def scrape(job_id, platform, username):
+    scraper, _ = PLATFORMS[platform]
+    if platform == "codechef":
+        # Hedged: publish the public numbers before the login finishes
+        def on_public(stats):
+            previous = JOB_QUEUE.get_result(platform, username)
+            # Nothing stored yet (cold start): wait for the full result
+            if previous is None:
+                return
+            merged = merge_codechef_public(stats, previous)
+            JOB_QUEUE.publish_partial(job_id, NODE_ID, platform, username, merged)
+        return scraper(username, on_public=on_public)
+    return scraper(username)
+
+
+def heartbeat_loop(stop):
+    while not stop.is_set():
+        try:
+            JOB_QUEUE.heartbeat(NODE_ID)
+        except Exception as e:
+            logger.error(f"Node {NODE_ID}: heartbeat failed: {e}")
+        stop.wait(HEARTBEAT_EVERY)
+
+
+def ack(job_id, platform, username, data, duration):
+    if "error" in data:
+        # Keep the last good result; retry after a backoff until max_attempts
+        logger.error(f"Node {NODE_ID}: {platform}/{username} failed: {data['error']}")
+        JOB_QUEUE.fail(job_id, NODE_ID)
+        return
+    if platform == "codechef" and not data.get("authenticated"):
+        # Login failed this run — don't lose the highest rating we already know
+        data = merge_codechef_public(data, JOB_QUEUE.get_result(platform, username))
+    if not JOB_QUEUE.complete(job_id, NODE_ID, platform, username, data, duration):
+        logger.warning(f"Node {NODE_ID}: lease on {platform}/{username} expired, result dropped")
+
+
+def work_loop(stop):
+    while not stop.is_set():
+        try:
+            jobs = JOB_QUEUE.lease(NODE_ID)
+        except Exception as e:
+            logger.error(f"Node {NODE_ID}: lease failed: {e}")
+            jobs = []
+        if not jobs:
+            stop.wait(POLL_INTERVAL)
+            continue
+
+        for job_id, platform, username in jobs:
+            logger.info(f"Node {NODE_ID}: scraping {platform}/{username}")
+            started = time.monotonic()
+            try:
+                data = scrape(job_id, platform, username)
+            except Exception as e:
+                data = {"error": str(e)}
+            duration = time.monotonic() - started
+            # A queue error (e.g. "database is locked") must not kill the worker
+            # thread — the heartbeat would keep its users assigned to a dead worker
+            try:
+                ack(job_id, platform, username, data, duration)
+            except Exception as e:
+                logger.error(f"Node {NODE_ID}: could not record {platform}/{username}: {e}")
+
+
+def main():
+    if JOB_QUEUE is None:
+        raise SystemExit("SCRAPER_QUEUE_DB must be set to run a scraper node")
+
+    stop = threading.Event()
+    JOB_QUEUE.heartbeat(NODE_ID)
+    threading.Thread(target=heartbeat_loop, args=(stop,), daemon=True).start()
+    workers = [threading.Thread(target=work_loop, args=(stop,), daemon=True)
+               for _ in range(NODE_CONCURRENCY)]
+    for w in workers:
+        w.start()
+    logger.info(f"Node {NODE_ID}: started with {NODE_CONCURRENCY} worker(s)")
+
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        while not stop.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for w in workers:
+            w.join()
+        JOB_QUEUE.leave(NODE_ID)
+        logger.info(f"Node {NODE_ID}: stopped")
+
+
+if __name__ == "__main__":
+    main()
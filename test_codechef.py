@@ -0,0 +1,88 @@
+"""
+Tests for hedged CodeChef fetching (public page raced against the login).
+Network and Selenium are mocked out:  python -m unittest test_codechef
+"""
+
+import os
+import threading
+import unittest
+from unittest import mock
+
+# Import as a worker so the module doesn't start its scheduler or a scrape
+os.environ["SCRAPER_ROLE"] = "worker"
+os.environ.pop("SCRAPER_QUEUE_DB", None)
+
+import backend_scraper as bs
+
+
+PUBLIC = {"username": "alice", "rating": "1500", "stars": "2★", "highest_rating": "N/A",
+          "total_problems_solved": "40", "global_rank": "100", "country_rank": "10",
+          "authenticated": False}
+AUTH = {**PUBLIC, "rating": "1510", "highest_rating": "1600", "authenticated": True}
+
+
+class HedgedCodeChefTest(unittest.TestCase):
+    def run_hedged(self, public, auth, auth_waits_for_public=False):
+        published = threading.Event()
+        calls = []
+
+        def fake_auth(username, password):
+            if auth_waits_for_public:
+                # Only a hedged fetch publishes while the login is still running
+                self.assertTrue(published.wait(5), "on_public did not fire before the login finished")
+            calls.append("auth")
+            return auth
+
+        def on_public(stats):
+            calls.append(("public", stats))
+            published.set()
+
+        with mock.patch.object(bs, "_codechef_public_stats", return_value=public), \
+             mock.patch.object(bs, "_codechef_authenticated_stats", side_effect=fake_auth), \
+             mock.patch.object(bs, "_codechef_selenium_stats", return_value={"selenium": True}) as selenium:
+            result = bs.get_codechef_stats("alice", password="secret", on_public=on_public)
+        return result, calls, selenium
+
+    def test_public_is_published_before_login_finishes(self):
+        result, calls, _ = self.run_hedged(PUBLIC, AUTH, auth_waits_for_public=True)
+        self.assertEqual(calls, [("public", PUBLIC), "auth"])
+        self.assertEqual(result, {**PUBLIC, **AUTH})
+
+    def test_login_failure_returns_public(self):
+        result, calls, selenium = self.run_hedged(PUBLIC, None)
+        self.assertEqual(result, PUBLIC)
+        self.assertIn(("public", PUBLIC), calls)
+        selenium.assert_not_called()
+
+    def test_public_failure_is_not_published(self):
+        result, calls, _ = self.run_hedged(None, AUTH)
+        self.assertEqual(calls, ["auth"])
+        self.assertEqual(result, AUTH)
+
+    def test_falls_back_to_selenium_when_both_fail(self):
+        result, _, selenium = self.run_hedged(None, None)
+        selenium.assert_called_once_with("alice")
+        self.assertEqual(result, {"selenium": True})
+
+
+class StoreCodeChefTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(bs, "save_cache")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, bs, "STATS_CACHE", bs.STATS_CACHE)
+
+    def test_unauthenticated_result_keeps_known_highest_rating(self):
+        bs.STATS_CACHE = {"codechef": AUTH}
+        bs._store_platform("codechef", PUBLIC)
+        self.assertEqual(bs.STATS_CACHE["codechef"]["highest_rating"], "1600")
+        self.assertEqual(bs.STATS_CACHE["codechef"]["rating"], "1500")
+
+    def test_public_publish_skipped_on_cold_start(self):
+        bs.STATS_CACHE = {}
+        bs._publish_codechef_public(PUBLIC)
+        self.assertEqual(bs.STATS_CACHE, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+"""
+Tests for the SQLite job queue used by multi-node scraping.
+Standard library only:  python -m unittest test_job_queue
+"""
+
+import os
+import tempfile
+import time
+import unittest
+
+from job_queue import HashRing, JobQueue
+
+
+class JobQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "queue.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_queue(self, **kwargs):
+        return JobQueue(self.path, **kwargs)
+
+    def test_enqueue_is_deduplicated(self):
+        q = self.make_queue()
+        q.heartbeat("a")
+        q.enqueue("leetcode", "alice")
+        q.enqueue("leetcode", "alice")
+        self.assertEqual(len(q.lease("a", limit=10)), 1)
+
+    def test_leased_job_is_invisible_until_lease_expires(self):
+        q = self.make_queue(visibility_timeout=0.2)
+        q.heartbeat("a")
+        q.enqueue("leetcode", "alice")
+        self.assertEqual(len(q.lease("a")), 1)
+        self.assertEqual(q.lease("a"), [])
+        time.sleep(0.3)
+        self.assertEqual(len(q.lease("a")), 1)
+
+    def test_complete_after_lost_lease_is_rejected(self):
+        q = self.make_queue(visibility_timeout=0.2)
+        q.heartbeat("a")
+        q.heartbeat("b")
+        # Pick a user owned by "a" while both nodes are live
+        ring = HashRing(["a", "b"])
+        user = next(u for u in (f"u{i}" for i in range(100)) if ring.node_for(u) == "a")
+        q.enqueue("leetcode", user)
+        [(job_id, _, _)] = q.lease("a")
+
+        # "a" stalls past its lease and leaves the ring; "b" takes the job over
+        time.sleep(0.3)
+        q.leave("a")
+        [(job_id_b, _, _)] = q.lease("b")
+        self.assertEqual(job_id_b, job_id)
+
+        self.assertFalse(q.complete(job_id, "a", "leetcode", user, {"stale": True}))
+        self.assertFalse(q.publish_partial(job_id, "a", "leetcode", user, {"stale": True}))
+        self.assertIsNone(q.get_result("leetcode", user))
+        self.assertTrue(q.complete(job_id, "b", "leetcode", user, {"fresh": True}))
+        self.assertEqual(q.get_result("leetcode", user), {"fresh": True})
+
+    def test_publish_partial_keeps_job_leased(self):
+        q = self.make_queue()
+        q.heartbeat("a")
+        q.enqueue("codechef", "alice")
+        [(job_id, _, _)] = q.lease("a")
+        self.assertTrue(q.publish_partial(job_id, "a", "codechef", "alice", {"rating": "1500"}))
+        self.assertEqual(q.get_result("codechef", "alice"), {"rating": "1500"})
+        self.assertTrue(q.complete(job_id, "a", "codechef", "alice", {"rating": "1500", "highest_rating": "1600"}))
+        self.assertEqual(q.lease("a"), [])
+
+    def test_fail_retries_then_drops_after_max_attempts(self):
+        q = self.make_queue(max_attempts=2, retry_backoff=0.05)
+        q.heartbeat("a")
+        q.enqueue("gfg", "alice")
+        [(job_id, _, _)] = q.lease("a")
+        q.fail(job_id, "a")
+        time.sleep(0.1)
+        [(job_id, _, _)] = q.lease("a")
+        q.fail(job_id, "a")
+        time.sleep(0.2)
+        self.assertEqual(q.lease("a"), [])
+
+    def test_failed_job_is_invisible_during_backoff(self):
+        q = self.make_queue(max_attempts=5, retry_backoff=0.2)
+        q.heartbeat("a")
+        q.enqueue("gfg", "alice")
+        [(job_id, _, _)] = q.lease("a")
+        q.fail(job_id, "a")
+        self.assertEqual(q.lease("a"), [])
+        time.sleep(0.3)
+        [(job_id, _, _)] = q.lease("a")
+
+        # Second failure backs off twice as long (0.4s)
+        q.fail(job_id, "a")
+        time.sleep(0.3)
+        self.assertEqual(q.lease("a"), [])
+        time.sleep(0.2)
+        self.assertEqual(len(q.lease("a")), 1)
+
+    def test_expired_leases_stop_after_max_attempts(self):
+        q = self.make_queue(visibility_timeout=0.05, max_attempts=3)
+        q.heartbeat("a")
+        q.enqueue("gfg", "alice")
+        for _ in range(3):
+            self.assertEqual(len(q.lease("a")), 1)
+            time.sleep(0.1)
+        self.assertEqual(q.lease("a"), [])
+
+    def test_users_move_to_survivor_when_node_stops_heartbeating(self):
+        q = self.make_queue(node_ttl=0.2)
+        q.heartbeat("a")
+        q.heartbeat("b")
+        users = [f"u{i}" for i in range(20)]
+        for u in users:
+            q.enqueue("leetcode", u)
+
+        ring = HashRing(["a", "b"])
+        owned_by_b = {u for u in users if ring.node_for(u) == "b"}
+        self.assertTrue(owned_by_b)
+        leased_by_a = {u for _, _, u in q.lease("a", limit=100)}
+        self.assertFalse(leased_by_a & owned_by_b)
+
+        # "b" stops heartbeating; once it ages out, "a" owns its users
+        time.sleep(0.3)
+        q.heartbeat("a")
+        self.assertEqual(q.live_nodes(), ["a"])
+        self.assertEqual({u for _, _, u in q.lease("a", limit=100)}, owned_by_b)
+
+    def test_complete_tracks_average_duration_and_partial_flag(self):
+        q = self.make_queue()
+        q.heartbeat("a")
+        for duration in (10.0, 20.0):
+            q.enqueue("gfg", "alice")
+            [(job_id, _, _)] = q.lease("a")
+            q.publish_partial(job_id, "a", "gfg", "alice", {"coding_score": 1})
+            self.assertTrue(q.get_result_info("gfg", "alice")["partial"])
+            q.complete(job_id, "a", "gfg", "alice", {"coding_score": 2}, duration)
+
+        info = q.get_result_info("gfg", "alice")
+        self.assertFalse(info["partial"])
+        self.assertAlmostEqual(info["avg_duration"], 0.7 * 10.0 + 0.3 * 20.0)
+        self.assertEqual(info["data"], {"coding_score": 2})
+
+    def test_get_results_reads_many_rows(self):
+        q = self.make_queue()
+        q.put_result("leetcode", "alice", {"total_solved": 10})
+        q.put_result("gfg", "bob", {"coding_score": 5})
+        results = q.get_results([("leetcode", "alice"), ("gfg", "bob"), ("codechef", "carol")])
+        self.assertEqual(results, {
+            ("leetcode", "alice"): {"total_solved": 10},
+            ("gfg", "bob"): {"coding_score": 5},
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()
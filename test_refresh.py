@@ -0,0 +1,103 @@
+"""
+Tests for adaptive per-platform refresh scheduling.
+Scrapers are mocked out:  python -m unittest test_refresh
+"""
+
+import copy
+import os
+import threading
+import unittest
+from unittest import mock
+
+# Import as a worker so the module doesn't start its scheduler or a scrape
+os.environ["SCRAPER_ROLE"] = "worker"
+os.environ.pop("SCRAPER_QUEUE_DB", None)
+
+import backend_scraper as bs
+
+HOUR = 3600
+
+
+class RefreshTestCase(unittest.TestCase):
+    def setUp(self):
+        saved_state = copy.deepcopy(bs.REFRESH_STATE)
+        saved_cache = bs.STATS_CACHE
+        self.addCleanup(lambda: bs.REFRESH_STATE.update(saved_state))
+        self.addCleanup(setattr, bs, "STATS_CACHE", saved_cache)
+        patcher = mock.patch.object(bs, "save_cache")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # leetcode policy is (1, 3, 12) hours
+        bs.REFRESH_STATE["leetcode"].update(interval=3 * HOUR, fingerprint=None, cost=None)
+        bs.STATS_CACHE = {}
+
+
+class IntervalTest(RefreshTestCase):
+    def test_first_result_counts_as_unchanged(self):
+        self.assertFalse(bs._observe("leetcode", {"total_solved": 10}))
+        self.assertFalse(bs._observe("leetcode", {"total_solved": 10}))
+        self.assertTrue(bs._observe("leetcode", {"total_solved": 11}))
+
+    def test_error_result_says_nothing_about_change(self):
+        bs._observe("leetcode", {"total_solved": 10})
+        self.assertIsNone(bs._observe("leetcode", {"error": "timeout"}))
+        self.assertFalse(bs._observe("leetcode", {"total_solved": 10}))
+
+    def test_changed_halves_and_unchanged_stretches(self):
+        self.assertEqual(bs._next_interval("leetcode", True), 1.5 * HOUR)
+        self.assertEqual(bs._next_interval("leetcode", False), 2.25 * HOUR)
+
+    def test_no_new_data_keeps_interval(self):
+        self.assertEqual(bs._next_interval("leetcode", None), 3 * HOUR)
+        self.assertEqual(bs.REFRESH_STATE["leetcode"]["interval"], 3 * HOUR)
+
+    def test_interval_is_clamped_to_policy_bounds(self):
+        for _ in range(10):
+            bs._next_interval("leetcode", True)
+        self.assertEqual(bs.REFRESH_STATE["leetcode"]["interval"], 1 * HOUR)
+        for _ in range(20):
+            bs._next_interval("leetcode", False)
+        self.assertEqual(bs.REFRESH_STATE["leetcode"]["interval"], 12 * HOUR)
+
+    def test_cost_stretches_interval_up_to_max(self):
+        bs._record_cost("leetcode", bs.REFRESH_COST_SCALE)
+        self.assertEqual(bs._next_interval("leetcode", None), 6 * HOUR)
+        bs.REFRESH_STATE["leetcode"]["interval"] = 10 * HOUR
+        self.assertEqual(bs._next_interval("leetcode", None), 12 * HOUR)
+
+    def test_cost_is_a_running_average(self):
+        bs._record_cost("leetcode", 10)
+        bs._record_cost("leetcode", 20)
+        self.assertAlmostEqual(bs.REFRESH_STATE["leetcode"]["cost"], 0.7 * 10 + 0.3 * 20)
+
+
+class StoreTest(RefreshTestCase):
+    def test_failed_scrape_keeps_last_good_stats(self):
+        bs._store_platform("leetcode", {"total_solved": 10})
+        self.assertIsNone(bs._store_platform("leetcode", {"error": "timeout"}))
+        self.assertEqual(bs.STATS_CACHE["leetcode"], {"total_solved": 10})
+
+    def test_concurrent_scrape_of_same_platform_is_skipped(self):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow_scrape(platform):
+            calls.append(platform)
+            started.set()
+            release.wait(5)
+            return {"total_solved": 10}
+
+        with mock.patch.object(bs, "_scrape_platform", side_effect=slow_scrape):
+            worker = threading.Thread(target=bs._scrape_and_store, args=("leetcode",))
+            worker.start()
+            self.assertTrue(started.wait(5))
+            self.assertIsNone(bs._scrape_and_store("leetcode"))
+            release.set()
+            worker.join()
+        self.assertEqual(calls, ["leetcode"])
+        self.assertEqual(bs.STATS_CACHE["leetcode"], {"total_solved": 10})
+
+
+if __name__ == "__main__":
+    unittest.main()